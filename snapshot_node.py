@@ -1,8 +1,12 @@
-import base64
 import io
 
 from server import PromptServer
 
+try:
+    from pybase64 import b64encode as _b64encode  # SIMD encoder, optional
+except ImportError:
+    from base64 import b64encode as _b64encode
+
 
 class _AnyType(str):
     def __ne__(self, other):
@@ -11,6 +15,8 @@ class _AnyType(str):
 
 ANY_TYPE = _AnyType("*")
 
+_THUMB_SIZE = (200, 150)  # max (width, height) of capture thumbnails
+
 
 def _make_thumbnail(value):
     """Convert an image tensor to a base64 JPEG thumbnail, or return None."""
@@ -21,17 +27,35 @@ def _make_thumbnail(value):
         if value.ndim != 4 or value.shape[3] not in (3, 4):
             return None
 
+        import torch.nn.functional as F
         from PIL import Image
 
-        frame = value[0]  # first frame only
-        if frame.shape[2] == 4:
-            frame = frame[:, :, :3]  # drop alpha
-        arr = frame.clamp(0, 1).mul(255).byte().cpu().numpy()
+        frame = value[:1, :, :, :3]  # first frame only, drop alpha
+        # Resize on the tensor's own device to the final thumbnail size
+        # (aspect-preserving, never upscaling) before any conversion, so the
+        # clamp/scale/cast and the host copy only touch thumbnail-sized data
+        # and PIL never has to resample.
+        h, w = frame.shape[1], frame.shape[2]
+        scale = min(_THUMB_SIZE[0] / w, _THUMB_SIZE[1] / h)
+        if scale < 1:
+            size = (max(1, round(h * scale)), max(1, round(w * scale)))
+            small = F.interpolate(
+                frame.permute(0, 3, 1, 2), size=size, mode="area"
+            )
+            # interpolate() returned a fresh tensor, so scale it in place.
+            small = small.clamp_(0, 1).mul_(255).byte().permute(0, 2, 3, 1)
+        else:
+            small = frame.clamp(0, 1).mul(255).byte()
+        arr = small[0].contiguous().cpu().numpy()
         img = Image.fromarray(arr, mode="RGB")
-        img.thumbnail((200, 150), Image.LANCZOS)
         buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=75)
-        return base64.b64encode(buf.getvalue()).decode("ascii")
+        # Single-pass baseline encode with 4:2:0 chroma: at 200x150 the lower
+        # quality and skipped Huffman optimisation are not visible.
+        img.save(
+            buf, format="JPEG", quality=60,
+            optimize=False, progressive=False, subsampling=2,
+        )
+        return _b64encode(buf.getbuffer()).decode("ascii")
     except Exception:
         return None
 
@@ -2,8 +2,12 @@
 HTTP route handlers for snapshot storage.
 
 Registers endpoints with PromptServer.instance.routes at import time.
+Storage calls do blocking file I/O, so they run in the default executor via
+asyncio.to_thread() to keep the event loop responsive.
 """
 
+import asyncio
+import json
 import logging
 
 from aiohttp import web
@@ -11,6 +15,14 @@ from server import PromptServer
 
 from . import snapshot_storage as storage
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Request bodies carry full records (graphData included) on save/migrate.
+_loads = orjson.loads if orjson is not None else json.loads
+
 routes = PromptServer.instance.routes
 
 # Sanity caps to bound disk/memory use from a single request.
@@ -18,6 +30,32 @@ _MAX_BODY_BYTES = 128 * 1024 * 1024   # 128 MB per request
 _MAX_MIGRATE_RECORDS = 10000
 
 
+def _json(data, status=200):
+    """Like web.json_response(), but encoded with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            body = orjson.dumps(data)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; stdlib json still encodes them
+        else:
+            return web.Response(body=body, status=status, content_type="application/json")
+    return web.json_response(data, status=status)
+
+
+# Bodies of the constant responses, encoded once.  aiohttp Response objects
+# cannot be shared between requests, so each call still builds a new one.
+_OK_BODY = b'{"ok":true}'
+_INTERNAL_ERROR_BODY = b'{"error":"Internal server error"}'
+
+
+def _ok():
+    return web.Response(body=_OK_BODY, content_type="application/json")
+
+
+def _internal_error():
+    return web.Response(body=_INTERNAL_ERROR_BODY, status=500, content_type="application/json")
+
+
 def _too_large(request):
     """True if the request advertises a body larger than the cap."""
     cl = request.content_length
@@ -28,189 +66,188 @@ def _too_large(request):
 async def save_snapshot(request):
     try:
         if _too_large(request):
-            return web.json_response({"error": "Request too large"}, status=413)
-        data = await request.json()
+            return _json({"error": "Request too large"}, status=413)
+        data = await request.json(loads=_loads)
         record = data.get("record")
         if not record or "id" not in record or "workflowKey" not in record:
-            return web.json_response({"error": "Missing record with id and workflowKey"}, status=400)
-        storage.put(record)
-        return web.json_response({"ok": True})
+            return _json({"error": "Missing record with id and workflowKey"}, status=400)
+        await asyncio.to_thread(storage.put, record)
+        return _ok()
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/list")
 async def list_snapshots(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         if not workflow_key:
-            return web.json_response({"error": "Missing workflowKey"}, status=400)
-        records = storage.get_all_for_workflow(workflow_key)
-        return web.json_response(records)
+            return _json({"error": "Missing workflowKey"}, status=400)
+        records = await asyncio.to_thread(storage.get_all_for_workflow, workflow_key)
+        return _json(records)
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/get")
 async def get_snapshot(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         snapshot_id = data.get("id")
         if not workflow_key or not snapshot_id:
-            return web.json_response({"error": "Missing workflowKey or id"}, status=400)
-        record = storage.get_full_record(workflow_key, snapshot_id)
+            return _json({"error": "Missing workflowKey or id"}, status=400)
+        record = await asyncio.to_thread(storage.get_full_record, workflow_key, snapshot_id)
         if record is None:
-            return web.json_response({"error": "Not found"}, status=404)
-        return web.json_response(record)
+            return _json({"error": "Not found"}, status=404)
+        return _json(record)
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/update-meta")
 async def update_snapshot_meta(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         snapshot_id = data.get("id")
         fields = data.get("fields")
         if not workflow_key or not snapshot_id or not isinstance(fields, dict):
-            return web.json_response({"error": "Missing workflowKey, id, or fields"}, status=400)
-        ok = storage.update_meta(workflow_key, snapshot_id, fields)
+            return _json({"error": "Missing workflowKey, id, or fields"}, status=400)
+        ok = await asyncio.to_thread(storage.update_meta, workflow_key, snapshot_id, fields)
         if not ok:
-            return web.json_response({"error": "Not found"}, status=404)
-        return web.json_response({"ok": True})
+            return _json({"error": "Not found"}, status=404)
+        return _ok()
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/delete")
 async def delete_snapshot(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         snapshot_id = data.get("id")
         if not workflow_key or not snapshot_id:
-            return web.json_response({"error": "Missing workflowKey or id"}, status=400)
-        storage.delete(workflow_key, snapshot_id)
-        return web.json_response({"ok": True})
+            return _json({"error": "Missing workflowKey or id"}, status=400)
+        await asyncio.to_thread(storage.delete, workflow_key, snapshot_id)
+        return _ok()
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/delete-all")
 async def delete_all_snapshots(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         if not workflow_key:
-            return web.json_response({"error": "Missing workflowKey"}, status=400)
-        result = storage.delete_all_for_workflow(workflow_key)
-        return web.json_response(result)
+            return _json({"error": "Missing workflowKey"}, status=400)
+        result = await asyncio.to_thread(storage.delete_all_for_workflow, workflow_key)
+        return _json(result)
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.get("/snapshot-manager/workflows")
 async def list_workflows(request):
     try:
-        keys = storage.get_all_workflow_keys()
-        return web.json_response(keys)
+        keys = await asyncio.to_thread(storage.get_all_workflow_keys)
+        return _json(keys)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.get("/snapshot-manager/usage")
 async def storage_usage(request):
     try:
-        return web.json_response(storage.get_storage_usage())
+        usage = await asyncio.to_thread(storage.get_storage_usage)
+        return _json(usage)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/export")
 async def export_workflow(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         if not workflow_key:
-            return web.json_response({"error": "Missing workflowKey"}, status=400)
-        records = storage.get_full_records_for_workflow(workflow_key)
-        return web.json_response({"version": 1, "workflowKey": workflow_key, "records": records})
+            return _json({"error": "Missing workflowKey"}, status=400)
+        records = await asyncio.to_thread(storage.get_full_records_for_workflow, workflow_key)
+        return _json({"version": 1, "workflowKey": workflow_key, "records": records})
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/prune")
 async def prune_snapshots(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         workflow_key = data.get("workflowKey")
         max_snapshots = data.get("maxSnapshots")
         source = data.get("source")
         protected_ids = data.get("protectedIds")
         max_age_days = data.get("maxAgeDays")
         if not workflow_key or max_snapshots is None:
-            return web.json_response({"error": "Missing workflowKey or maxSnapshots"}, status=400)
-        deleted = storage.prune(
+            return _json({"error": "Missing workflowKey or maxSnapshots"}, status=400)
+        deleted = await asyncio.to_thread(
+            storage.prune,
             workflow_key, int(max_snapshots),
             source=source, protected_ids=protected_ids,
             max_age_days=int(max_age_days) if max_age_days else None,
         )
-        return web.json_response({"deleted": deleted})
+        return _json({"deleted": deleted})
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/migrate")
 async def migrate_snapshots(request):
     try:
         if _too_large(request):
-            return web.json_response({"error": "Request too large"}, status=413)
-        data = await request.json()
+            return _json({"error": "Request too large"}, status=413)
+        data = await request.json(loads=_loads)
         records = data.get("records")
         if not isinstance(records, list):
-            return web.json_response({"error": "Missing records array"}, status=400)
+            return _json({"error": "Missing records array"}, status=400)
         if len(records) > _MAX_MIGRATE_RECORDS:
-            return web.json_response({"error": "Too many records"}, status=413)
-        imported = 0
-        for record in records:
-            if "id" in record and "workflowKey" in record:
-                storage.put(record)
-                imported += 1
-        return web.json_response({"imported": imported})
+            return _json({"error": "Too many records"}, status=413)
+        records = [r for r in records if "id" in r and "workflowKey" in r]
+        imported = await asyncio.to_thread(storage.put_many, records)
+        return _json({"imported": imported})
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 # ─── Profile Endpoints ───────────────────────────────────────────────
@@ -218,58 +255,58 @@ async def migrate_snapshots(request):
 @routes.post("/snapshot-manager/profile/save")
 async def save_profile(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         profile = data.get("profile")
         if not profile or "id" not in profile:
-            return web.json_response({"error": "Missing profile with id"}, status=400)
-        storage.profile_put(profile)
-        return web.json_response({"ok": True})
+            return _json({"error": "Missing profile with id"}, status=400)
+        await asyncio.to_thread(storage.profile_put, profile)
+        return _ok()
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.get("/snapshot-manager/profile/list")
 async def list_profiles(request):
     try:
-        profiles = storage.profile_get_all()
-        return web.json_response(profiles)
+        profiles = await asyncio.to_thread(storage.profile_get_all)
+        return _json(profiles)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/profile/get")
 async def get_profile(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         profile_id = data.get("id")
         if not profile_id:
-            return web.json_response({"error": "Missing id"}, status=400)
-        profile = storage.profile_get(profile_id)
+            return _json({"error": "Missing id"}, status=400)
+        profile = await asyncio.to_thread(storage.profile_get, profile_id)
         if profile is None:
-            return web.json_response({"error": "Not found"}, status=404)
-        return web.json_response(profile)
+            return _json({"error": "Not found"}, status=404)
+        return _json(profile)
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
 
 
 @routes.post("/snapshot-manager/profile/delete")
 async def delete_profile(request):
     try:
-        data = await request.json()
+        data = await request.json(loads=_loads)
         profile_id = data.get("id")
         if not profile_id:
-            return web.json_response({"error": "Missing id"}, status=400)
-        storage.profile_delete(profile_id)
-        return web.json_response({"ok": True})
+            return _json({"error": "Missing id"}, status=400)
+        await asyncio.to_thread(storage.profile_delete, profile_id)
+        return _ok()
     except ValueError as e:
-        return web.json_response({"error": str(e)}, status=400)
+        return _json({"error": str(e)}, status=400)
     except Exception:
         logging.exception("[Snapshot Manager] request handler error")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _internal_error()
@@ -6,16 +6,77 @@ Stores each snapshot as an individual JSON file under:
 
 Workflow keys are percent-encoded for filesystem safety.
 
+graphData is kept out of ``<id>.json`` in a sidecar that only
+get_full_record() and export read: plain JSON ``<id>.graph`` by default, or
+``<id>.graph.zst`` (zstd-compressed) when SNAPSHOT_MANAGER_COMPRESS_GRAPHS=1
+is set and the optional ``zstandard`` package is installed.  Older files with
+inline graphData are split on first full read.
+
+Each workflow directory also holds an append-only ``meta.jsonl`` index: one
+metadata line per put/update and one tombstone line per delete.  Warming the
+cache reads that single file instead of opening every snapshot; a directory
+listing reconciles it with the snapshot files actually present.
+
 An in-memory metadata cache avoids redundant disk reads for list/prune/delete
-operations.  Only get_full_record() reads a file from disk after warm-up.
+operations.  Only get_full_record() reads a file from disk after warm-up, and
+a small LRU of recently read full records spares repeat reads of the same one.
 """
 
+import bisect
+import functools
 import json
 import os
+import re
 import shutil
+import sys
 import tempfile
+import threading
 import time
 import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ─── JSON codec ──────────────────────────────────────────────────────
+# orjson when installed (much faster on large graphData), stdlib otherwise.
+# Both work on bytes so files are always read and written in binary mode.
+
+
+# json.dumps() builds a new JSONEncoder whenever options are passed, so keep
+# one.  (json.loads() with no options already reuses a shared decoder.)
+_json_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _json_dumps(obj):
+    return _json_encode(obj).encode("utf-8")
+
+
+if orjson is not None:
+    def _dumps(obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which stdlib json still encodes
+            return _json_dumps(obj)
+
+    def _loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Stdlib json also accepts NaN/Infinity, which files it wrote may hold
+            return json.loads(data)
+else:
+    _dumps = _json_dumps
+    _loads = json.loads
 
 # ─── Data directory resolution ───────────────────────────────────────
 # Prefer ComfyUI's persistent user directory; fall back to extension-local
@@ -31,11 +92,78 @@ except Exception:
 
 _DATA_DIR = os.path.join(_USER_SM_DIR, "snapshots")
 
+# ─── Locking ─────────────────────────────────────────────────────────
+# Route handlers call into this module from worker threads, so every public
+# function holds _lock: the caches, the index logs and the files they mirror
+# must change together.
+_lock = threading.RLock()
+
+
+def _synchronized(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
 # ─── In-memory metadata cache ────────────────────────────────────────
 # Maps workflow_key -> list of metadata dicts (sorted by timestamp asc).
 # Metadata is everything *except* graphData.
 _cache = {}
+_cache_by_id = {}  # workflow_key -> {snapshot_id: the same dict as in _cache}
+_cache_keys = {}  # workflow_key -> timestamps, parallel to the _cache list
 _cache_warmed = set()  # workflow keys already loaded from disk
+# Set once every workflow dir has been warmed.  From then on _cache holds
+# every non-empty workflow, so put() warms any workflow it creates.
+_all_warmed = False
+
+# ─── Metadata index log ──────────────────────────────────────────────
+# Lines are either {"m": <metadata>, "t": <mtime_ns of <id>.json>} (latest
+# line per id wins) or a tombstone {"deleted": <id>}.  Files are written
+# before their line is appended, so warm-up re-reads any snapshot whose file
+# mtime differs from its own line's "t" (bare metadata lines from before "t"
+# was recorded count as unknown).  The log is rewritten once superseded lines
+# and tombstones make up more than _INDEX_COMPACT_RATIO of it.
+_INDEX_NAME = "meta.jsonl"
+_INDEX_COMPACT_RATIO = 0.25
+_index_lines = {}  # workflow_key -> line count of its index (warmed keys only)
+
+_WARM_WORKERS = 8  # threads used to warm many workflows at once
+_PARALLEL_IO_MIN = 32  # files in one batch before _map_io moves them to a pool
+
+# ─── graphData sidecars ──────────────────────────────────────────────
+# The decompressor is only used under _lock, so one shared instance is safe.
+# Compressors are per thread: warm-up worker threads also write sidecars,
+# and building a compression context costs more than compressing a graph.
+# Neither suffix ends in ".json", so "*.json" is always one snapshot record.
+_ZSTD_GRAPH_SUFFIX = ".graph.zst"
+_JSON_GRAPH_SUFFIX = ".graph"
+_GRAPH_SUFFIXES = (_ZSTD_GRAPH_SUFFIX, _JSON_GRAPH_SUFFIX)
+_ZSTD_LEVEL = 3
+# Compression is opt-in: zstandard is not a declared dependency, and .zst
+# sidecars become unreadable if it is ever uninstalled.
+_COMPRESS_GRAPHS = os.environ.get("SNAPSHOT_MANAGER_COMPRESS_GRAPHS", "") not in ("", "0")
+if _COMPRESS_GRAPHS and zstandard is None:
+    print("[Snapshot Manager] SNAPSHOT_MANAGER_COMPRESS_GRAPHS is set but zstandard "
+          "is not installed; storing graphs uncompressed")
+    _COMPRESS_GRAPHS = False
+if zstandard is not None:
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+_zstd_local = threading.local()
+
+
+def _zstd_compress(data):
+    compressor = getattr(_zstd_local, "compressor", None)
+    if compressor is None:
+        compressor = _zstd_local.compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+    return compressor.compress(data)
+
+# ─── Full-record LRU ─────────────────────────────────────────────────
+# Maps (workflow_key, snapshot_id) -> (stat signature, full record).  Entries
+# are validated against the file's mtime/size on every hit, so an external
+# rewrite also invalidates them; our own writers drop them explicitly.
+_RECORD_CACHE_MAX = 32
+_record_cache = OrderedDict()
 
 
 def _extract_meta(record):
@@ -44,38 +172,291 @@ def _extract_meta(record):
     The (potentially large, base64) thumbnail is replaced by a boolean
     ``hasThumbnail`` flag; clients lazy-load the image via get_full_record.
     """
-    meta = {k: v for k, v in record.items() if k not in ("graphData", "thumbnail")}
+    meta = _intern_meta({k: v for k, v in record.items() if k not in ("graphData", "thumbnail")})
     if record.get("thumbnail"):
         meta["hasThumbnail"] = True
     return meta
 
 
+_INTERNED_VALUE_KEYS = ("source", "changeType")
+
+
+def _intern_meta(meta):
+    """Return *meta* with interned keys and enum-like values.
+
+    Thousands of cached entries then share one str object per key name and
+    per "source"/"changeType" value instead of each holding its own copy.
+    """
+    meta = {sys.intern(k): v for k, v in meta.items()}
+    for k in _INTERNED_VALUE_KEYS:
+        v = meta.get(k)
+        if type(v) is str:
+            meta[k] = sys.intern(v)
+    return meta
+
+
+def _forget_record(workflow_key, snapshot_id):
+    """Drop *snapshot_id* from the full-record LRU."""
+    _record_cache.pop((workflow_key, snapshot_id), None)
+
+
+def _index_line(meta, mtime):
+    """Return the index line recording *meta* and its file's *mtime*."""
+    return {"m": meta, "t": mtime}
+
+
+def _read_index(d):
+    """Replay the index log in *d*. Return ({id: meta}, {id: mtime}, line_count)."""
+    by_id = {}
+    stamps = {}
+    lines = 0
+    try:
+        with open(os.path.join(d, _INDEX_NAME), "rb") as f:
+            data = f.read()
+    except OSError:
+        return by_id, stamps, lines
+    for line in data.splitlines():
+        if not line:
+            continue
+        lines += 1
+        try:
+            rec = _loads(line)
+        except ValueError:
+            continue  # torn line (bad JSON or cut-off UTF-8) from an interrupted append
+        if not isinstance(rec, dict):
+            continue
+        if isinstance(rec.get("m"), dict) and "id" in rec["m"]:
+            meta, mtime = rec["m"], rec.get("t")
+        elif "id" in rec:
+            meta, mtime = rec, None  # bare metadata line from an older release
+        else:
+            by_id.pop(rec.get("deleted"), None)
+            stamps.pop(rec.get("deleted"), None)
+            continue
+        by_id[meta["id"]] = _intern_meta(meta)
+        stamps[meta["id"]] = mtime
+    return by_id, stamps, lines
+
+
+def _append_index(workflow_key, d, items):
+    """Append _index_line() dicts / tombstones to the index log in *d*."""
+    if not items:
+        return
+    data = b"".join(_dumps(item) + b"\n" for item in items)
+    try:
+        with open(os.path.join(d, _INDEX_NAME), "a+b") as f:
+            if f.tell():
+                # Terminate a line torn by an interrupted append so the new
+                # entries are not glued onto it.
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+    except OSError:
+        # The snapshot files were already written: forget the cache so the
+        # next read rescans them instead of trusting stale entries.
+        _drop_cache(workflow_key)
+        raise
+    if workflow_key in _index_lines:
+        _index_lines[workflow_key] += len(items)
+
+
+def _rewrite_index(workflow_key, d, entries):
+    """Replace the index log in *d* with exactly one line per entry.
+
+    Each entry keeps the file mtime its current line recorded.
+    """
+    stamps = _read_index(d)[1]
+    _atomic_write_bytes(
+        os.path.join(d, _INDEX_NAME),
+        b"".join(_dumps(_index_line(e, stamps.get(e.get("id")))) + b"\n" for e in entries),
+    )
+    _index_lines[workflow_key] = len(entries)
+
+
+def _maybe_compact_index(workflow_key, d):
+    """Rewrite the index log once too much of it is dead lines."""
+    total = _index_lines.get(workflow_key)
+    entries = _cache.get(workflow_key)
+    if not total or entries is None:
+        return
+    if total - len(entries) > total * _INDEX_COMPACT_RATIO:
+        _rewrite_index(workflow_key, d, entries)
+
+
+def _map_io(fn, items):
+    """Return [fn(item) for item in items], overlapping the calls on threads
+    when there are enough of them.
+
+    For per-file filesystem work: open/read/unlink release the GIL, so a
+    pool hides their latency; small batches are not worth the pool start-up.
+    """
+    if len(items) <= _PARALLEL_IO_MIN:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=_WARM_WORKERS) as ex:
+        return list(ex.map(fn, items))
+
+
+def _read_unindexed(d, snapshot_id):
+    """Return a fresh index line for a snapshot file missing from (or stale
+    in) the index, or None if the file cannot be read."""
+    try:
+        with open(os.path.join(d, f"{snapshot_id}.json"), "rb") as f:
+            record = _loads(f.read())
+            mtime = os.fstat(f.fileno()).st_mtime_ns
+    except (ValueError, OSError):
+        return None
+    if "graphData" in record:
+        # Old single-file layout: store the metadata separately now, so
+        # this graph is never parsed again just to rebuild the index.
+        try:
+            mtime = _write_snapshot(d, snapshot_id, record)
+        except OSError:
+            pass
+    return _index_line(_extract_meta(record), mtime)
+
+
+def _scan_workflow(d):
+    """Load snapshot metadata for workflow dir *d* from its index and listing.
+
+    Touches no module state (only files inside *d*), so it may run on worker
+    threads.  Returns
+    (entries sorted by timestamp, {id: entry}, index line count, index lines
+    to append for files missing from or stale in the index).
+    """
+    try:
+        with os.scandir(d) as it:
+            on_disk = {e.name[:-5]: e for e in it if e.name.endswith(".json") and e.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return [], {}, 0, []
+    by_id, stamps, lines = _read_index(d)
+    # Reconcile the log with the snapshot files actually on disk: drop
+    # entries whose file is gone, and index files the log never saw
+    # (pre-index data, migrated files, a crash between write and append).
+    for sid in by_id.keys() - on_disk.keys():
+        del by_id[sid]
+    missing = [sid for sid in on_disk if sid not in by_id]
+    # A file whose mtime is not the one its line recorded was rewritten
+    # without that line landing (a crash or failed append after update_meta
+    # or a put over an existing id, an older release): re-read it rather
+    # than trust the stale line.
+    for sid in by_id:
+        try:
+            if on_disk[sid].stat().st_mtime_ns != stamps.get(sid):
+                missing.append(sid)
+        except OSError:
+            pass
+    fresh = _map_io(functools.partial(_read_unindexed, d), missing)
+    unindexed = []
+    for sid, line in zip(missing, fresh):
+        if line is not None:
+            by_id[sid] = line["m"]
+            unindexed.append(line)
+    entries = sorted(by_id.values(), key=_timestamp)
+    return entries, by_id, lines, unindexed
+
+
+def _install_cache(workflow_key, d, scanned):
+    """Store a _scan_workflow() result as the warmed cache for *workflow_key*."""
+    entries, by_id, lines, unindexed = scanned
+    _set_entries(workflow_key, entries)
+    _cache_by_id[workflow_key] = by_id
+    _cache_warmed.add(workflow_key)
+    _index_lines[workflow_key] = lines
+    if entries:
+        _append_index(workflow_key, d, unindexed)
+        _maybe_compact_index(workflow_key, d)
+
+
 def _ensure_cached(workflow_key):
     """Warm the cache for *workflow_key* if not already loaded. Return cached list."""
     if workflow_key not in _cache_warmed:
         d = _workflow_dir(workflow_key)
-        entries = []
-        if os.path.isdir(d):
-            for fname in os.listdir(d):
-                if not fname.endswith(".json"):
-                    continue
-                path = os.path.join(d, fname)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        entries.append(_extract_meta(json.load(f)))
-                except (json.JSONDecodeError, OSError):
-                    continue
-        entries.sort(key=lambda r: r.get("timestamp", 0))
-        _cache[workflow_key] = entries
-        _cache_warmed.add(workflow_key)
+        _install_cache(workflow_key, d, _scan_workflow(d))
     return _cache.get(workflow_key, [])
 
 
+def _timestamp(meta):
+    return meta.get("timestamp", 0)
+
+
+def _set_entries(workflow_key, entries):
+    """Install timestamp-sorted *entries* as the cached list for *workflow_key*."""
+    _cache[workflow_key] = entries
+    _cache_keys[workflow_key] = [_timestamp(e) for e in entries]
+
+
+def _insort_by_timestamp(workflow_key, meta):
+    """Insert *meta* into the cached list, after equal timestamps."""
+    ts = _timestamp(meta)
+    keys = _cache_keys[workflow_key]
+    i = bisect.bisect_right(keys, ts)
+    keys.insert(i, ts)
+    _cache[workflow_key].insert(i, meta)
+
+
+def _index_of(workflow_key, entry):
+    """Return the position of *entry* (by identity) in the cached list."""
+    entries = _cache[workflow_key]
+    keys = _cache_keys[workflow_key]
+    ts = _timestamp(entry)
+    for i in range(bisect.bisect_left(keys, ts), bisect.bisect_right(keys, ts)):
+        if entries[i] is entry:
+            return i
+    # Not where its timestamp says; fall back to a full scan.
+    return next(i for i, e in enumerate(entries) if e is entry)
+
+
+def _remove_entry(workflow_key, entry):
+    """Remove *entry* from the cached list, keeping the key list in step."""
+    i = _index_of(workflow_key, entry)
+    del _cache[workflow_key][i]
+    del _cache_keys[workflow_key][i]
+
+
+_SPLICE_MAX = 8  # above this many removals, one list rebuild beats splicing
+
+
+def _uncache(workflow_key, d, snapshot_ids):
+    """Remove *snapshot_ids* from the cache of *workflow_key*, if it is warmed."""
+    by_id = _cache_by_id.get(workflow_key)
+    if by_id is None:
+        return
+    gone = [by_id.pop(sid) for sid in snapshot_ids if sid in by_id]
+    if not gone:
+        return
+    if len(gone) <= _SPLICE_MAX:
+        for entry in gone:
+            _remove_entry(workflow_key, entry)
+    else:
+        _set_entries(workflow_key, [e for e in _cache[workflow_key] if by_id.get(e.get("id")) is e])
+    if not _cache[workflow_key]:
+        _drop_cache(workflow_key)
+    else:
+        _maybe_compact_index(workflow_key, d)
+
+
+def _drop_cache(workflow_key):
+    """Forget everything cached for *workflow_key*."""
+    _cache.pop(workflow_key, None)
+    _cache_by_id.pop(workflow_key, None)
+    _cache_keys.pop(workflow_key, None)
+    _cache_warmed.discard(workflow_key)
+    _index_lines.pop(workflow_key, None)
+
+
 # ─── Helpers ─────────────────────────────────────────────────────────
 
 def _workflow_dir(workflow_key):
     if not workflow_key or not isinstance(workflow_key, str):
         raise ValueError(f"Invalid workflow key: {workflow_key!r}")
+    return _encoded_workflow_dir(workflow_key)
+
+
+@functools.lru_cache(maxsize=1024)
+def _encoded_workflow_dir(workflow_key):
+    # Memoized: quote() is a pure-Python loop and the same few keys are
+    # resolved on every request.  Invalid keys raise and are not cached.
     encoded = urllib.parse.quote(workflow_key, safe="")
     path = os.path.normpath(os.path.join(_DATA_DIR, encoded))
     # Defense in depth: urllib.parse.quote() leaves "." and ".." unescaped, so a
@@ -87,13 +468,22 @@ def _workflow_dir(workflow_key):
     return path
 
 
+@functools.lru_cache(maxsize=1024)
+def _decoded_workflow_key(encoded_name):
+    # Inverse of the quote() above, memoized for the same reason.
+    return urllib.parse.unquote(encoded_name)
+
+
+_ID_BAD = re.compile(r"[/\\]|\.\.")
+
+
 def _validate_id(snapshot_id):
-    if not snapshot_id or "/" in snapshot_id or "\\" in snapshot_id or ".." in snapshot_id:
+    if not snapshot_id or _ID_BAD.search(snapshot_id):
         raise ValueError(f"Invalid snapshot id: {snapshot_id!r}")
 
 
-def _atomic_write_json(path, obj):
-    """Write *obj* as JSON to *path* atomically (temp file + os.replace).
+def _atomic_write_bytes(path, data):
+    """Write *data* to *path* atomically (temp file + os.replace).
 
     Prevents a crash or concurrent reader mid-write from observing a
     truncated/corrupt file (the old in-place open("w") truncated first).
@@ -101,8 +491,14 @@ def _atomic_write_json(path, obj):
     directory = os.path.dirname(path)
     fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(obj, f, separators=(",", ":"))
+        # Raw os.write on the fd: one syscall for any realistic record, and
+        # no buffered file object in between.  Loop in case it is short.
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
         os.replace(tmp, path)
     except BaseException:
         try:
@@ -112,196 +508,470 @@ def _atomic_write_json(path, obj):
         raise
 
 
+def _atomic_write_json(path, obj):
+    """Write *obj* as JSON to *path* atomically."""
+    _atomic_write_bytes(path, _dumps(obj))
+
+
+def _write_snapshot(d, snapshot_id, record, keep_graph=False):
+    """Write *record* into workflow dir *d*, with graphData in its sidecar.
+
+    A record without graphData gets a JSON ``null`` sidecar, replacing any
+    earlier graph of the same id, unless *keep_graph* is set (the record was
+    read back from a metadata file and its graph is to stay as it is).
+
+    The sidecar is written first so a reader never sees a metadata file whose
+    graph is missing.  Returns the mtime of the written ``<id>.json``, for
+    its index line.
+    """
+    if "graphData" in record or not keep_graph:
+        graph = _dumps(record.get("graphData"))
+        if _COMPRESS_GRAPHS:
+            _atomic_write_bytes(
+                os.path.join(d, snapshot_id + _ZSTD_GRAPH_SUFFIX),
+                _zstd_compress(graph),
+            )
+            stale = _JSON_GRAPH_SUFFIX
+        else:
+            _atomic_write_bytes(os.path.join(d, snapshot_id + _JSON_GRAPH_SUFFIX), graph)
+            stale = _ZSTD_GRAPH_SUFFIX
+        # Drop a sidecar in the other format (compression was toggled since
+        # this id was last written) so reads never pick up the old graph.
+        _unlink_if_exists(os.path.join(d, snapshot_id + stale))
+        record = {k: v for k, v in record.items() if k != "graphData"}
+    path = os.path.join(d, f"{snapshot_id}.json")
+    _atomic_write_bytes(path, _dumps(record))
+    return os.stat(path).st_mtime_ns
+
+
+_GRAPH_UNREADABLE = object()  # _read_graph(): sidecar missing or unreadable
+
+
+def _read_graph(d, snapshot_id):
+    """Return the graphData stored in the sidecar for *snapshot_id*.
+
+    None means the snapshot was stored without a graph; _GRAPH_UNREADABLE
+    means the sidecar is missing or cannot be read.
+    """
+    if zstandard is not None:
+        try:
+            with open(os.path.join(d, snapshot_id + _ZSTD_GRAPH_SUFFIX), "rb") as f:
+                return _loads(_zstd_decompressor.decompress(f.read()))
+        except FileNotFoundError:
+            pass
+        except (zstandard.ZstdError, ValueError, OSError):
+            return _GRAPH_UNREADABLE
+    try:
+        with open(os.path.join(d, snapshot_id + _JSON_GRAPH_SUFFIX), "rb") as f:
+            return _loads(f.read())
+    except FileNotFoundError:
+        pass
+    except (ValueError, OSError):
+        return _GRAPH_UNREADABLE
+    if zstandard is None and os.path.exists(os.path.join(d, snapshot_id + _ZSTD_GRAPH_SUFFIX)):
+        print(f"[Snapshot Manager] zstandard is not installed; cannot read graph of {snapshot_id}")
+    return _GRAPH_UNREADABLE
+
+
+def _sidecar_id(name):
+    """Return the snapshot id a graph sidecar file name belongs to, or None."""
+    for suffix in _GRAPH_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+
+def _merge_fields(record, fields):
+    """Merge *fields* into *record*; None values remove the key.
+
+    Returns True if *record* changed.
+    """
+    changed = False
+    for k, v in fields.items():
+        if v is None:
+            if k in record:
+                del record[k]
+                changed = True
+        elif k not in record or record[k] != v:
+            record[k] = v
+            changed = True
+    return changed
+
+
+def _remove_snapshot_files(d, snapshot_id):
+    """Remove a snapshot's files from *d*. Returns True if its record existed."""
+    try:
+        os.remove(os.path.join(d, f"{snapshot_id}.json"))
+    except FileNotFoundError:
+        return False
+    for suffix in _GRAPH_SUFFIXES:
+        try:
+            os.remove(os.path.join(d, snapshot_id + suffix))
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def _unlink_if_exists(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_dir_if_empty(d):
+    """Remove workflow dir *d*, its index and stray sidecars, once no snapshots remain."""
+    try:
+        names = os.listdir(d)
+    except OSError:
+        return
+    if any(name.endswith(".json") for name in names):
+        return
+    for name in names:
+        if name == _INDEX_NAME or _sidecar_id(name) is not None:
+            os.remove(os.path.join(d, name))
+    try:
+        os.rmdir(d)
+    except OSError:
+        pass  # stray non-snapshot files; leave the directory alone
+
+
 # ─── Public API ──────────────────────────────────────────────────────
 
+@_synchronized
 def put(record):
     """Write one snapshot record to disk and update the cache."""
     snapshot_id = record["id"]
     workflow_key = record["workflowKey"]
     _validate_id(snapshot_id)
     d = _workflow_dir(workflow_key)
-    os.makedirs(d, exist_ok=True)
-    path = os.path.join(d, f"{snapshot_id}.json")
-    _atomic_write_json(path, record)
+    try:
+        mtime = _write_snapshot(d, snapshot_id, record)
+    except FileNotFoundError:
+        os.makedirs(d, exist_ok=True)  # first snapshot of this workflow
+        mtime = _write_snapshot(d, snapshot_id, record)
+    _forget_record(workflow_key, snapshot_id)
+    meta = _extract_meta(record)
+    _append_index(workflow_key, d, [_index_line(meta, mtime)])
 
     # Update cache only if already warmed; otherwise _ensure_cached will
-    # pick up the new file from disk on next read.
-    if workflow_key in _cache_warmed:
-        meta = _extract_meta(record)
-        cached = _cache[workflow_key]
-        cached[:] = [e for e in cached if e.get("id") != snapshot_id]
-        cached.append(meta)
-        cached.sort(key=lambda r: r.get("timestamp", 0))
-
-
+    # pick up the new entry from the index on next read.
+    if _all_warmed and workflow_key not in _cache_warmed:
+        _ensure_cached(workflow_key)
+    elif workflow_key in _cache_warmed:
+        by_id = _cache_by_id[workflow_key]
+        old = by_id.get(snapshot_id)
+        if old is not None:
+            _remove_entry(workflow_key, old)
+        _insort_by_timestamp(workflow_key, meta)
+        by_id[snapshot_id] = meta
+        _maybe_compact_index(workflow_key, d)
+
+
+@_synchronized
+def put_many(records):
+    """Write many snapshot records at once. Returns the number written.
+
+    Like calling put() for each record, but the directory, index append and
+    cache update happen once per workflow instead of once per record.  All
+    ids and workflow keys are validated before anything is written.
+    """
+    groups = {}
+    dirs = {}
+    for record in records:
+        _validate_id(record["id"])
+        workflow_key = record["workflowKey"]
+        # Validate before using the key as a dict key: an unhashable one
+        # must raise ValueError like put(), not TypeError.
+        dirs[workflow_key] = _workflow_dir(workflow_key)
+        groups.setdefault(workflow_key, []).append(record)
+
+    for workflow_key, group in groups.items():
+        d = dirs[workflow_key]
+        os.makedirs(d, exist_ok=True)
+        metas = []
+        lines = []
+        for record in group:
+            mtime = _write_snapshot(d, record["id"], record)
+            _forget_record(workflow_key, record["id"])
+            meta = _extract_meta(record)
+            metas.append(meta)
+            lines.append(_index_line(meta, mtime))
+        _append_index(workflow_key, d, lines)
+
+        if _all_warmed and workflow_key not in _cache_warmed:
+            _ensure_cached(workflow_key)
+        elif workflow_key in _cache_warmed:
+            by_id = _cache_by_id[workflow_key]
+            for meta in metas:
+                by_id[meta["id"]] = meta
+            _set_entries(workflow_key, sorted(by_id.values(), key=_timestamp))
+            _maybe_compact_index(workflow_key, d)
+    return len(records)
+
+
+@_synchronized
 def get_all_for_workflow(workflow_key):
-    """Return all snapshot metadata for a workflow (no graphData), sorted ascending by timestamp."""
-    return [dict(e) for e in _ensure_cached(workflow_key)]
+    """Return all snapshot metadata for a workflow (no graphData), sorted ascending by timestamp.
+
+    The list is a fresh shallow copy but its dicts are the cached entries
+    themselves: callers must treat them as read-only.
+    """
+    return list(_ensure_cached(workflow_key))
 
 
+@_synchronized
 def get_full_record(workflow_key, snapshot_id):
-    """Read a single snapshot file from disk (with graphData). Returns dict or None."""
+    """Read a single snapshot file from disk (with graphData). Returns dict or None.
+
+    Recently read records are served from an LRU; callers must not mutate
+    the returned dict.
+    """
     _validate_id(snapshot_id)
-    path = os.path.join(_workflow_dir(workflow_key), f"{snapshot_id}.json")
-    if not os.path.isfile(path):
+    d = _workflow_dir(workflow_key)
+    path = os.path.join(d, f"{snapshot_id}.json")
+    try:
+        st = os.stat(path)
+    except OSError:
         return None
+    key = (workflow_key, snapshot_id)
+    sig = (st.st_mtime_ns, st.st_size)
+    hit = _record_cache.get(key)
+    if hit is not None and hit[0] == sig:
+        _record_cache.move_to_end(key)
+        return hit[1]
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        with open(path, "rb") as f:
+            record = _loads(f.read())
+    except (ValueError, OSError):
         return None
+    if "graphData" not in record:
+        graph = _read_graph(d, snapshot_id)
+        if graph is _GRAPH_UNREADABLE:
+            return None  # not restorable; don't cache
+        if graph is not None:
+            record["graphData"] = graph
+    else:
+        # Old single-file layout: split it so later reads of the metadata
+        # file (update_meta, index rebuilds) skip the graph.  See also
+        # _scan_workflow(), which splits these files at first warm-up.
+        try:
+            _write_snapshot(d, snapshot_id, record)
+            st = os.stat(path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+    _record_cache[key] = (sig, record)
+    _record_cache.move_to_end(key)
+    while len(_record_cache) > _RECORD_CACHE_MAX:
+        _record_cache.popitem(last=False)
+    return record
 
 
+@_synchronized
 def update_meta(workflow_key, snapshot_id, fields):
-    """Merge *fields* into an existing snapshot on disk without touching graphData.
+    """Merge *fields* into an existing snapshot on disk.
+
+    The graph sidecar is only rewritten when *fields* sets or clears graphData.
 
     Returns True on success, False if the file does not exist.
     """
     _validate_id(snapshot_id)
-    path = os.path.join(_workflow_dir(workflow_key), f"{snapshot_id}.json")
-    if not os.path.isfile(path):
+    d = _workflow_dir(workflow_key)
+    path = os.path.join(d, f"{snapshot_id}.json")
+    try:
+        with open(path, "rb") as f:
+            record = _loads(f.read())
+    except FileNotFoundError:
         return False
-    with open(path, "r", encoding="utf-8") as f:
-        record = json.load(f)
-    # Merge fields; None values remove the key
-    for k, v in fields.items():
-        if v is None:
-            record.pop(k, None)
+    # graphData normally lives in the sidecar, not in *record*, so clearing
+    # it is a change even though _merge_fields() finds no key to remove.
+    drop_graph = "graphData" in fields and fields["graphData"] is None
+    if not _merge_fields(record, fields) and not drop_graph and "graphData" not in record:
+        return True  # nothing changed (and no legacy inline graph to split)
+    mtime = _write_snapshot(d, snapshot_id, record, keep_graph=not drop_graph)
+    _forget_record(workflow_key, snapshot_id)
+    meta = _extract_meta(record)
+    _append_index(workflow_key, d, [_index_line(meta, mtime)])
+    # Swap in a fresh cache entry instead of mutating the old one, so lists
+    # already returned by get_all_for_workflow never change underneath.
+    by_id = _cache_by_id.get(workflow_key)
+    entry = by_id.get(snapshot_id) if by_id is not None else None
+    if entry is not None:
+        by_id[snapshot_id] = meta
+        if _timestamp(meta) == _timestamp(entry):
+            _cache[workflow_key][_index_of(workflow_key, entry)] = meta
         else:
-            record[k] = v
-    _atomic_write_json(path, record)
-    # Update cache entry
-    for entry in _cache.get(workflow_key, []):
-        if entry.get("id") == snapshot_id:
-            for k, v in fields.items():
-                if k == "graphData":
-                    continue
-                if v is None:
-                    entry.pop(k, None)
-                else:
-                    entry[k] = v
-            break
+            _remove_entry(workflow_key, entry)
+            _insort_by_timestamp(workflow_key, meta)
+    _maybe_compact_index(workflow_key, d)
     return True
 
 
+@_synchronized
 def delete(workflow_key, snapshot_id):
     """Remove one snapshot file and its cache entry. Cleans up empty workflow dir."""
     _validate_id(snapshot_id)
     d = _workflow_dir(workflow_key)
-    path = os.path.join(d, f"{snapshot_id}.json")
-    if os.path.isfile(path):
-        os.remove(path)
+    if _remove_snapshot_files(d, snapshot_id):
+        _append_index(workflow_key, d, [{"deleted": snapshot_id}])
+    _forget_record(workflow_key, snapshot_id)
 
     # Update cache
-    if workflow_key in _cache:
-        _cache[workflow_key] = [e for e in _cache[workflow_key] if e.get("id") != snapshot_id]
-        if not _cache[workflow_key]:
-            del _cache[workflow_key]
-            _cache_warmed.discard(workflow_key)
+    _uncache(workflow_key, d, [snapshot_id])
 
     # Clean up empty directory
-    if os.path.isdir(d) and not os.listdir(d):
-        os.rmdir(d)
+    _remove_dir_if_empty(d)
 
 
+@_synchronized
 def delete_all_for_workflow(workflow_key):
     """Delete all unlocked snapshots for a workflow. Returns {lockedCount}."""
     entries = _ensure_cached(workflow_key)
-    locked = []
-    locked_count = 0
+    locked = [rec for rec in entries if rec.get("locked")]
+    locked_ids = {rec["id"] for rec in locked}
     d = _workflow_dir(workflow_key)
-    for rec in entries:
-        if rec.get("locked"):
-            locked_count += 1
-            locked.append(rec)
-        else:
-            _validate_id(rec["id"])
-            path = os.path.join(d, f"{rec['id']}.json")
-            if os.path.isfile(path):
-                os.remove(path)
-
-    # Update cache to locked-only
+    # One directory pass collecting every unlocked snapshot file, then
+    # unlink them directly (no per-file isfile() stat).
+    paths = []
+    try:
+        with os.scandir(d) as it:
+            for entry in it:
+                name = entry.name
+                snapshot_id = name[:-5] if name.endswith(".json") else _sidecar_id(name)
+                if snapshot_id is not None and snapshot_id not in locked_ids:
+                    paths.append(entry.path)
+    except FileNotFoundError:
+        pass  # no directory yet, nothing to delete
+    _map_io(_unlink_if_exists, paths)
+    for key in [k for k in _record_cache if k[0] == workflow_key and k[1] not in locked_ids]:
+        del _record_cache[key]
+
+    # Update cache and index to locked-only
     if locked:
-        _cache[workflow_key] = locked
+        _set_entries(workflow_key, locked)
+        _cache_by_id[workflow_key] = {rec["id"]: rec for rec in locked}
+        _rewrite_index(workflow_key, d, locked)
     else:
-        _cache.pop(workflow_key, None)
-        _cache_warmed.discard(workflow_key)
+        _drop_cache(workflow_key)
 
     # Clean up empty directory
-    if os.path.isdir(d) and not os.listdir(d):
-        os.rmdir(d)
-    return {"lockedCount": locked_count}
+    _remove_dir_if_empty(d)
+    return {"lockedCount": len(locked)}
 
 
-def get_all_workflow_keys():
-    """Scan subdirs and return [{workflowKey, count}]."""
-    if not os.path.isdir(_DATA_DIR):
-        return []
-    results = []
-    for encoded_name in os.listdir(_DATA_DIR):
-        subdir = os.path.join(_DATA_DIR, encoded_name)
-        if not os.path.isdir(subdir):
-            continue
-        workflow_key = urllib.parse.unquote(encoded_name)
+def _warm_all():
+    """Warm the cache for every workflow dir on disk, once per process."""
+    global _all_warmed
+    if _all_warmed:
+        return
+    try:
+        with os.scandir(_DATA_DIR) as it:
+            subdirs = [e.name for e in it if e.is_dir()]
+    except FileNotFoundError:
+        subdirs = []
+    keys = []
+    for encoded_name in subdirs:
+        workflow_key = _decoded_workflow_key(encoded_name)
         try:
-            entries = _ensure_cached(workflow_key)
+            keys.append((workflow_key, _workflow_dir(workflow_key)))
         except ValueError:
             continue  # skip stray/legacy dirs whose name is not a valid key
-        if not entries:
-            continue
-        results.append({"workflowKey": workflow_key, "count": len(entries)})
+
+    # Cold workflows are independent disk reads: scan them concurrently, then
+    # install the results from this (lock-holding) thread.
+    cold = [(k, d) for k, d in keys if k not in _cache_warmed]
+    if len(cold) > 1:
+        with ThreadPoolExecutor(max_workers=min(_WARM_WORKERS, len(cold))) as ex:
+            scans = ex.map(_scan_workflow, [d for _, d in cold])
+            for (workflow_key, d), scanned in zip(cold, scans):
+                _install_cache(workflow_key, d, scanned)
+
+    for workflow_key, _ in keys:
+        _ensure_cached(workflow_key)
+    _all_warmed = True
+
+
+@_synchronized
+def get_all_workflow_keys():
+    """Return [{workflowKey, count}] for every workflow that has snapshots."""
+    _warm_all()
+    results = [
+        {"workflowKey": workflow_key, "count": len(entries)}
+        for workflow_key, entries in _cache.items()
+        if entries
+    ]
     results.sort(key=lambda r: r["workflowKey"])
     return results
 
 
+@_synchronized
 def get_storage_usage():
     """Return {totalBytes, workflows: [{workflowKey, bytes, count}]} for all snapshots."""
     workflows = []
     total = 0
-    if os.path.isdir(_DATA_DIR):
-        for encoded_name in os.listdir(_DATA_DIR):
-            subdir = os.path.join(_DATA_DIR, encoded_name)
-            if not os.path.isdir(subdir):
-                continue
-            size = 0
-            count = 0
-            for fname in os.listdir(subdir):
-                if not fname.endswith(".json"):
+    try:
+        with os.scandir(_DATA_DIR) as it:
+            subdirs = [e for e in it if e.is_dir()]
+    except FileNotFoundError:
+        subdirs = []
+    for subdir in subdirs:
+        size = 0
+        count = 0
+        with os.scandir(subdir.path) as it:
+            for entry in it:
+                name = entry.name
+                is_record = name.endswith(".json")
+                if not (is_record or name == _INDEX_NAME or _sidecar_id(name) is not None):
                     continue
                 try:
-                    size += os.path.getsize(os.path.join(subdir, fname))
-                    count += 1
+                    size += entry.stat().st_size
                 except OSError:
                     continue
-            if count == 0:
-                continue
-            total += size
-            workflows.append({
-                "workflowKey": urllib.parse.unquote(encoded_name),
-                "bytes": size,
-                "count": count,
-            })
+                if is_record:
+                    count += 1
+        if count == 0:
+            continue
+        total += size
+        workflows.append({
+            "workflowKey": _decoded_workflow_key(subdir.name),
+            "bytes": size,
+            "count": count,
+        })
     workflows.sort(key=lambda w: w["bytes"], reverse=True)
     return {"totalBytes": total, "workflows": workflows}
 
 
+@_synchronized
 def get_full_records_for_workflow(workflow_key):
     """Return all full snapshot records (with graphData) for a workflow, for export."""
     d = _workflow_dir(workflow_key)
     records = []
-    if os.path.isdir(d):
-        for fname in os.listdir(d):
-            if not fname.endswith(".json"):
-                continue
-            try:
-                with open(os.path.join(d, fname), "r", encoding="utf-8") as f:
-                    records.append(json.load(f))
-            except (json.JSONDecodeError, OSError):
+    try:
+        names = os.listdir(d)
+    except (FileNotFoundError, NotADirectoryError):
+        names = []
+    for fname in names:
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(d, fname), "rb") as f:
+                record = _loads(f.read())
+        except (ValueError, OSError):
+            continue
+        if "graphData" not in record:
+            graph = _read_graph(d, fname[:-5])
+            if graph is _GRAPH_UNREADABLE:
+                print(f"[Snapshot Manager] Skipping {fname[:-5]} in export: graph could not be read")
                 continue
+            if graph is not None:
+                record["graphData"] = graph
+        records.append(record)
     records.sort(key=lambda r: r.get("timestamp", 0))
     return records
 
 
+@_synchronized
 def prune(workflow_key, max_snapshots, source=None, protected_ids=None, max_age_days=None):
     """Delete oldest unlocked snapshots beyond limit. Returns count deleted.
 
@@ -319,141 +989,169 @@ def prune(workflow_key, max_snapshots, source=None, protected_ids=None, max_age_
     _protected = set(protected_ids) if protected_ids else set()
     entries = _ensure_cached(workflow_key)
     if source == "node":
-        candidates = [r for r in entries if not r.get("locked") and r.get("source") == "node" and r.get("id") not in _protected]
+        def prunable(r):
+            return not r.get("locked") and r.get("source") == "node" and r.get("id") not in _protected
     elif source == "regular":
-        candidates = [r for r in entries if not r.get("locked") and r.get("source") != "node" and r.get("id") not in _protected]
+        def prunable(r):
+            return not r.get("locked") and r.get("source") != "node" and r.get("id") not in _protected
     else:
-        candidates = [r for r in entries if not r.get("locked") and r.get("id") not in _protected]
-    delete_ids = set()
-    to_delete = []
-    # Oldest-beyond-count get deleted...
-    if len(candidates) > max_snapshots:
-        for rec in candidates[: len(candidates) - max_snapshots]:
-            to_delete.append(rec)
-            delete_ids.add(rec["id"])
-    # ...as do any candidates older than the age cutoff (locked/protected
-    # snapshots were already excluded from candidates above).
+        def prunable(r):
+            return not r.get("locked") and r.get("id") not in _protected
+    # Oldest-beyond-count get deleted, as do any candidates older than the
+    # age cutoff (locked/protected snapshots are never candidates).  One
+    # walk over the timestamp-sorted entries settles both, and stops as soon
+    # as the excess is used up and entries are newer than the cutoff.
+    excess = sum(1 for r in entries if prunable(r)) - max_snapshots
+    cutoff = None
     if max_age_days and max_age_days > 0:
         cutoff = time.time() * 1000 - max_age_days * 86400000
-        for rec in candidates:
-            if rec["id"] not in delete_ids and rec.get("timestamp", 0) < cutoff:
-                to_delete.append(rec)
-                delete_ids.add(rec["id"])
-    if not to_delete:
+    if excess <= 0 and cutoff is None:
         return 0
     d = _workflow_dir(workflow_key)
-    deleted = 0
-    delete_ids = set()
-    for rec in to_delete:
+    selected = []
+    for rec in entries:
+        if excess <= 0 and (cutoff is None or _timestamp(rec) >= cutoff):
+            break
+        if not prunable(rec):
+            continue
+        excess -= 1
         _validate_id(rec["id"])
-        path = os.path.join(d, f"{rec['id']}.json")
-        if os.path.isfile(path):
-            os.remove(path)
-            deleted += 1
-            delete_ids.add(rec["id"])
+        selected.append(rec["id"])
+    removed = _map_io(functools.partial(_remove_snapshot_files, d), selected)
+    delete_ids = []
+    for sid, existed in zip(selected, removed):
+        if existed:
+            delete_ids.append(sid)
+        _forget_record(workflow_key, sid)
+    deleted = len(delete_ids)
+    if not deleted:
+        return 0
 
-    # Update cache
-    if delete_ids and workflow_key in _cache:
-        _cache[workflow_key] = [e for e in _cache[workflow_key] if e.get("id") not in delete_ids]
-        if not _cache[workflow_key]:
-            del _cache[workflow_key]
-            _cache_warmed.discard(workflow_key)
+    # Update index and cache
+    _append_index(workflow_key, d, [{"deleted": sid} for sid in delete_ids])
+    _uncache(workflow_key, d, delete_ids)
 
     # Clean up empty directory
-    if os.path.isdir(d) and not os.listdir(d):
-        os.rmdir(d)
+    _remove_dir_if_empty(d)
 
     return deleted
 
 
 # ─── Profile Storage ─────────────────────────────────────────────────
-# Profiles are stored as individual JSON files under snapshot_manager/profiles/<id>.json
-
-_PROFILES_DIR = os.path.join(_USER_SM_DIR, "profiles")
-_profile_cache = None  # list of profile dicts, or None if not loaded
+# All profiles live in one snapshot_manager/profiles.json file holding
+# {id: profile}, rewritten atomically on every change.  Older versions kept
+# one profiles/<id>.json file per profile; those are folded in on first load.
 
-
-def _ensure_profiles_dir():
-    os.makedirs(_PROFILES_DIR, exist_ok=True)
+_PROFILES_PATH = os.path.join(_USER_SM_DIR, "profiles.json")
+_PROFILES_DIR = os.path.join(_USER_SM_DIR, "profiles")  # legacy per-file layout
+_profile_cache = None  # {profile_id: profile dict}, or None if not loaded
 
 
 def _load_profile_cache():
     global _profile_cache
     if _profile_cache is not None:
         return _profile_cache
-    _ensure_profiles_dir()
-    profiles = []
-    for fname in os.listdir(_PROFILES_DIR):
-        if not fname.endswith(".json"):
-            continue
-        path = os.path.join(_PROFILES_DIR, fname)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                profiles.append(json.load(f))
-        except (json.JSONDecodeError, OSError):
-            continue
-    profiles.sort(key=lambda p: p.get("timestamp", 0))
+    try:
+        with open(_PROFILES_PATH, "rb") as f:
+            profiles = _loads(f.read())
+        if not isinstance(profiles, dict):
+            raise ValueError("top-level value is not an object")
+    except FileNotFoundError:
+        profiles = {}
+    except ValueError as e:
+        # Move the bad file aside rather than let the next save overwrite
+        # every profile in it.  If even that fails, the error propagates
+        # and nothing is written (as for any other read error).
+        corrupt = f"{_PROFILES_PATH}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        os.replace(_PROFILES_PATH, corrupt)
+        print(f"[Snapshot Manager] Could not parse {_PROFILES_PATH} ({e}); moved it to {corrupt}")
+        profiles = {}
     _profile_cache = profiles
+    _migrate_profile_files(profiles)
     return _profile_cache
 
 
-def _invalidate_profile_cache():
-    global _profile_cache
-    _profile_cache = None
+def _migrate_profile_files(profiles):
+    """Fold legacy profiles/<id>.json files into *profiles* and remove them."""
+    try:
+        names = [n for n in os.listdir(_PROFILES_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return
+    migrated = []
+    for fname in names:
+        try:
+            with open(os.path.join(_PROFILES_DIR, fname), "rb") as f:
+                profiles.setdefault(fname[:-5], _loads(f.read()))
+        except (ValueError, OSError):
+            continue
+        migrated.append(fname)
+    if not migrated:
+        return
+    _save_profiles()
+    for fname in migrated:
+        try:
+            os.remove(os.path.join(_PROFILES_DIR, fname))
+        except OSError:
+            pass
+    try:
+        os.rmdir(_PROFILES_DIR)
+    except OSError:
+        pass  # unreadable leftovers or stray files; leave them be
+
+
+def _save_profiles():
+    try:
+        _atomic_write_json(_PROFILES_PATH, _profile_cache)
+    except FileNotFoundError:
+        os.makedirs(_USER_SM_DIR, exist_ok=True)  # first profile ever
+        _atomic_write_json(_PROFILES_PATH, _profile_cache)
 
 
+@_synchronized
 def profile_put(profile):
     """Create or update a profile. profile must have 'id'."""
     pid = profile["id"]
     _validate_id(pid)
-    _ensure_profiles_dir()
-    path = os.path.join(_PROFILES_DIR, f"{pid}.json")
-    _atomic_write_json(path, profile)
-    _invalidate_profile_cache()
+    _load_profile_cache()[pid] = dict(profile)
+    _save_profiles()
 
 
+@_synchronized
 def profile_get_all():
     """Return all profiles sorted by timestamp."""
-    return [dict(p) for p in _load_profile_cache()]
+    profiles = [dict(p) for p in _load_profile_cache().values()]
+    profiles.sort(key=lambda p: p.get("timestamp", 0))
+    return profiles
 
 
+@_synchronized
 def profile_get(profile_id):
     """Return a single profile by ID, or None."""
     _validate_id(profile_id)
-    path = os.path.join(_PROFILES_DIR, f"{profile_id}.json")
-    if not os.path.isfile(path):
-        return None
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
-        return None
+    profile = _load_profile_cache().get(profile_id)
+    return dict(profile) if profile is not None else None
 
 
+@_synchronized
 def profile_delete(profile_id):
     """Delete a profile by ID."""
     _validate_id(profile_id)
-    path = os.path.join(_PROFILES_DIR, f"{profile_id}.json")
-    if os.path.isfile(path):
-        os.remove(path)
-    _invalidate_profile_cache()
+    if _load_profile_cache().pop(profile_id, None) is not None:
+        _save_profiles()
 
 
+@_synchronized
 def profile_update(profile_id, fields):
     """Merge fields into an existing profile. Returns True on success."""
     _validate_id(profile_id)
-    path = os.path.join(_PROFILES_DIR, f"{profile_id}.json")
-    if not os.path.isfile(path):
+    profiles = _load_profile_cache()
+    if profile_id not in profiles:
         return False
-    with open(path, "r", encoding="utf-8") as f:
-        profile = json.load(f)
-    for k, v in fields.items():
-        if v is None:
-            profile.pop(k, None)
-        else:
-            profile[k] = v
-    _atomic_write_json(path, profile)
-    _invalidate_profile_cache()
+    profile = dict(profiles[profile_id])
+    if not _merge_fields(profile, fields):
+        return True
+    profiles[profile_id] = profile
+    _save_profiles()
     return True
 
 